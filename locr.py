@@ -6,8 +6,9 @@ A blazing fast, dependency-free lines of code counter.
 Generates a language-wise breakdown of code, comments, and blank lines.
 
 Behavioral Notes:
-  - Uses a "Hybrid" engine: Prunes heavy folders eagerly, then uses Git for 100% accuracy.
-  - Automatically respects .gitignore rules (prioritizes `git check-ignore`).
+  - Git repos are listed with a single `git ls-files` call (tracked + untracked, minus ignored).
+  - Elsewhere, matches .gitignore rules in-memory (root, nested, .git/info/exclude) while walking;
+    the rare patterns it cannot translate exactly are skipped.
   - Eagerly prunes ignored directories (e.g., node_modules) for maximum speed.
   - Ignores binary files and .git folder contents automatically.
 
@@ -17,6 +18,15 @@ Arguments:
   -c, --color   : Enable colored output in the terminal.
   -s, --stats   : Show percentage statistics (Share % and Density %).
   --raw         : "Raw" mode. Ignores .gitignore rules and counts EVERYTHING.
+  --max-size MB : Skip files larger than MB megabytes (default: 2, 0 = no limit).
+  -j, --jobs N  : Analyze files in N processes (1 = single process). By default one
+                  per CPU, but only when the files average 8 KB or more.
+  --io-threads N: Reader threads when analyzing in a single process
+                  (default: 4 per CPU, at most 32).
+  --locality    : Walk and read files in inode order, roughly their order on disk.
+                  Cuts seeking on spinning disks and cold network storage.
+  --no-git-verify : Never run Git. Ignore rules are matched in memory only; the rare
+                  patterns that can't be translated exactly (e.g. [[:alpha:]]) are skipped.
   -o, --out     : Output file behavior:
                   - [No value]: Save to '[folder]_locr.txt' INSIDE the scanned folder.
                   - [Filename]: Save to the specific filename provided (in current dir).
@@ -59,15 +69,23 @@ Commands:
 """
 
 import argparse
-import fnmatch
+import errno
 import itertools
+import mmap
+import multiprocessing
 import os
+import re
 import shutil
+import signal
+import stat
 import subprocess
 import sys
+import threading
 import time
-from collections import defaultdict
-from typing import List, Tuple, Set, Optional
+from array import array
+from operator import add
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 
 # --- IMPORT CONFIG ---
 try:
@@ -76,214 +94,1037 @@ except ImportError:
     print("Error: locr_config.py not found. Please ensure it is in the same directory.")
     sys.exit(1)
 
+# Dense ids for per-language counters (several extensions share a language)
+LANG_NAMES = sorted({d["name"] for d in LANGUAGES.values()})
+LANG_ID = {name: i for i, name in enumerate(LANG_NAMES)}
+LANG_COLORS = [Colors.WHITE] * len(LANG_NAMES)
+for _lang in LANGUAGES.values():
+    LANG_COLORS[LANG_ID[_lang["name"]]] = _lang.get("color", Colors.WHITE)
+
+# Flattened per-extension rules: (language id, single, m_start, m_end).
+# Markers are pre-encoded bytes (b"" when absent) since files are analyzed raw.
+# Keys are case-folded here, so a lookup only ever folds the file's suffix.
+LangRule = Tuple[int, bytes, bytes, bytes]
+LANG_RULES: Dict[str, LangRule] = {}
+for _ext, _lang in LANGUAGES.items():
+    _m_start, _m_end = _lang.get("multi") or ("", "")
+    LANG_RULES[_ext.lower()] = (
+        LANG_ID[_lang["name"]],
+        (_lang.get("single") or "").encode("ascii"),
+        _m_start.encode("ascii"),
+        _m_end.encode("ascii"),
+    )
+
+# Same table keyed by raw bytes, for filtering `git ls-files` output before decoding
+LANG_RULES_B: Dict[bytes, LangRule] = {ext.encode(): rule for ext, rule in LANG_RULES.items()}
+
+# Line counting is dominated by small file reads, so oversubscribe the CPUs
+ANALYZE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Files opened (and prefetched) together by one worker
+PREFETCH_BATCH = 16
+# With jobs=None, worker processes are only used when a sample of the files
+# averages at least this size; smaller files are I/O-bound and stay on threads
+PROCESS_MIN_AVG_SIZE = 8 * 1024
+SIZE_SAMPLE = 64
+
+# Files above one window are mapped rather than read whole, and split one window
+# at a time. Anything smaller would be copied out whole anyway, and a plain read
+# does that without the cost of setting up and faulting in a mapping.
+MMAP_WINDOW = 1024 * 1024
+MMAP_THRESHOLD = MMAP_WINDOW
+# madvise() is missing on Windows and before Python 3.8
+_MADV_SEQUENTIAL = getattr(mmap, "MADV_SEQUENTIAL", None) if hasattr(mmap.mmap, "madvise") else None
+_MADV_DONTNEED = getattr(mmap, "MADV_DONTNEED", None) if hasattr(mmap.mmap, "madvise") else None
+
+# Windows would otherwise open descriptors in text mode and translate newlines.
+# Non-blocking, so a FIFO (e.g. behind a symlink Git lists) opens at once and is
+# then rejected by the S_ISREG check instead of waiting forever for a writer;
+# regular files read the same either way.
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_NONBLOCK", 0)
+# Failures to open that say nothing about the file: the process (or system) is
+# out of descriptors, as reader threads x PREFETCH_BATCH can exceed a low ulimit
+_FD_EXHAUSTED = frozenset((errno.EMFILE, errno.ENFILE))
+
+if hasattr(os, "posix_fadvise"):
+    def _prefetch(fd: int) -> None:
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+else:
+    def _prefetch(fd: int) -> None:
+        pass
+
+# =============================================================================
+# Ignore Rules
+# =============================================================================
+
+
+def _translate_glob(pat: str) -> str:
+    """
+    Translates a gitignore glob into a regex fragment.
+    Raises ValueError for syntax we cannot mirror exactly (POSIX classes, etc).
+    """
+    res = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            j = i
+            while j < n and pat[j] == "*":
+                j += 1
+            if j - i == 2 and (i == 0 or pat[i - 1] == "/") and (j == n or pat[j] == "/"):
+                if j == n:
+                    res.append(".*")  # "foo/**" -> everything inside
+                else:
+                    res.append("(?:.*/)?")  # "**/" -> zero or more directories
+                    j += 1
+            else:
+                res.append("[^/]*")
+            i = j
+        elif c == "?":
+            res.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = i + 1
+            if j < n and pat[j] in "!^":
+                j += 1
+            if j < n and pat[j] == "]":
+                j += 1
+            posix_class = False
+            while j < n and pat[j] != "]":
+                if pat[j] == "\\":
+                    j += 2
+                elif pat.startswith("[:", j) and pat.find(":]", j + 2) >= 0:
+                    posix_class = True
+                    j = pat.find(":]", j + 2) + 2
+                else:
+                    j += 1
+            if j >= n:
+                raise ValueError(f"unterminated bracket in {pat!r}")
+            if posix_class:
+                raise ValueError(f"character class in {pat!r}")
+            body = pat[i + 1 : j]
+            negate = body[:1] in ("!", "^")
+            if negate:
+                body = body[1:]
+            chars = []
+            k = 0
+            while k < len(body):
+                ch = body[k]
+                if ch == "\\" and k + 1 < len(body):
+                    k += 1
+                    ch = body[k]
+                elif ch == "-":
+                    chars.append("-")
+                    k += 1
+                    continue
+                chars.append(re.escape(ch))
+                k += 1
+            res.append(("[^/" if negate else "[") + "".join(chars) + "]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            res.append(re.escape(pat[i + 1]))
+            i += 2
+        else:
+            res.append(re.escape(c))
+            i += 1
+    return "".join(res)
+
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# A pattern without any of these is a plain literal
+_GLOB_CHARS = frozenset("*?[\\")
+
+# The built-in patterns that are plain directory names (all of them, as shipped)
+_PRUNE_NAMES = frozenset(
+    p for p in DEFAULT_IGNORE_PATTERNS if "/" not in p and not _GLOB_CHARS.intersection(p)
+)
+
+
+class IgnoreRules:
+    """
+    Compiled rules from a single ignore file (.gitignore, info/exclude, ...).
+    Paths are matched relative to `base`, the directory the file lives in.
+    """
+
+    def __init__(self, lines: List[str], base: str = ""):
+        self.base = base
+        # Whether any rule re-includes with "!"
+        self.negates = False
+        self._negate = []
+        # Slash-free patterns only ever look at the basename, so they are kept
+        # apart from anchored ones to avoid matching "(?:.*/)?" against full paths.
+        name_alts: List[Tuple[str, bool]] = []
+        path_alts: List[Tuple[str, bool]] = []
+        # Plain names ("node_modules"), paths ("docs/build") and extensions ("*.log")
+        # skip the regexes entirely: literal -> index of the last rule naming it.
+        # The "file" tables hold only rules that can match files; the "dir" ones hold all.
+        self._name_file_lit: Dict[str, int] = {}
+        self._name_dir_lit: Dict[str, int] = {}
+        self._path_file_lit: Dict[str, int] = {}
+        self._path_dir_lit: Dict[str, int] = {}
+        self._ext_file: Dict[str, int] = {}
+        self._ext_dir: Dict[str, int] = {}
+        # Regex group name ("r7") -> rule index, so a match never parses the name
+        self._group_idx: Dict[str, int] = {}
+
+        for line in lines:
+            if not line or line.startswith("#"):
+                continue
+            # Trailing spaces are ignored unless escaped
+            while line.endswith(" ") and not line.endswith("\\ "):
+                line = line[:-1]
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+                self.negates = True
+            dir_only = line.endswith("/")
+            if dir_only:
+                line = line[:-1]
+            anchored = "/" in line
+            if line.startswith("/"):
+                line = line[1:]
+            if not line:
+                continue
+            if not _GLOB_CHARS.intersection(line):
+                key = line
+                if anchored:
+                    file_lit, dir_lit = self._path_file_lit, self._path_dir_lit
+                else:
+                    file_lit, dir_lit = self._name_file_lit, self._name_dir_lit
+            elif not anchored and line.startswith("*.") and "." not in line[2:] \
+                    and not _GLOB_CHARS.intersection(line[2:]):
+                key = line[1:]
+                file_lit, dir_lit = self._ext_file, self._ext_dir
+            else:
+                key = None
+            if key is not None:
+                idx = len(self._negate)
+                self._negate.append(negate)
+                dir_lit[key] = idx
+                if not dir_only:
+                    file_lit[key] = idx
+                continue
+
+            try:
+                rx = _translate_glob(line)
+            except ValueError:
+                # Syntax we can't mirror exactly: the rule is skipped rather than guessed at
+                continue
+
+            idx = len(self._negate)
+            self._negate.append(negate)
+            self._group_idx[f"r{idx}"] = idx
+            (path_alts if anchored else name_alts).append((idx, rx, dir_only))
+
+        self._name_file_re = self._fuse((i, rx) for i, rx, dir_only in name_alts if not dir_only)
+        self._name_dir_re = self._fuse((i, rx) for i, rx, _ in name_alts)
+        self._path_file_re = self._fuse((i, rx) for i, rx, dir_only in path_alts if not dir_only)
+        self._path_dir_re = self._fuse((i, rx) for i, rx, _ in path_alts)
+        # Whether any rule looks past the basename, i.e. where in the tree a name sits matters
+        self.anchored = bool(self._path_dir_lit or self._path_dir_re)
+
+    @classmethod
+    def _fuse(cls, alts) -> Optional["re.Pattern"]:
+        """One regex over (rule index, translated pattern) pairs, a named group per rule."""
+        # Templates pasted together repeat patterns; an earlier copy can never
+        # outrank the last one, so only that one is kept in the alternation
+        latest: Dict[str, int] = {}
+        for idx, rx in alts:
+            latest[rx] = idx
+        return cls._compile(
+            f"(?P<r{idx}>{rx})" for rx, idx in sorted(latest.items(), key=lambda item: item[1])
+        )
+
+    @staticmethod
+    def _compile(alts) -> Optional["re.Pattern"]:
+        alts = list(alts)
+        if not alts:
+            return None
+        # Alternatives are tried in order, so the last rule in the file goes first
+        return re.compile("(?:" + "|".join(reversed(alts)) + r")\Z")
+
+    def match(self, path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """
+        Returns True (ignored), False (re-included by '!') or None (no rule matched).
+        `path` is relative to `base`; `name` is its last component.
+        """
+        if is_dir:
+            name_lit, path_lit, ext_lit = self._name_dir_lit, self._path_dir_lit, self._ext_dir
+            name_re, path_re = self._name_dir_re, self._path_dir_re
+        else:
+            name_lit, path_lit, ext_lit = self._name_file_lit, self._path_file_lit, self._ext_file
+            name_re, path_re = self._name_file_re, self._path_file_re
+
+        # Highest rule index wins, regardless of which table or regex it lives in
+        best = name_lit.get(name, -1)
+        if path_lit:
+            idx = path_lit.get(path, -1)
+            if idx > best:
+                best = idx
+        if ext_lit:
+            dot = name.rfind(".")
+            if dot >= 0:
+                idx = ext_lit.get(name[dot:], -1)
+                if idx > best:
+                    best = idx
+        if name_re is not None:
+            m = name_re.match(name)
+            if m is not None:
+                idx = self._group_idx[m.lastgroup]
+                if idx > best:
+                    best = idx
+        if path_re is not None:
+            m = path_re.match(path)
+            if m is not None:
+                idx = self._group_idx[m.lastgroup]
+                if idx > best:
+                    best = idx
+        if best < 0:
+            return None
+        return not self._negate[best]
+
+
 # =============================================================================
 # Core Logic
 # =============================================================================
 
 
 class LocrEngine:
-    def __init__(self, repo_path: str, raw_mode: bool = False):
+    def __init__(
+        self,
+        repo_path: str,
+        raw_mode: bool = False,
+        max_size: Optional[int] = None,
+        jobs: Optional[int] = 1,
+        git_verify: bool = True,
+        io_threads: int = ANALYZE_WORKERS,
+        locality: bool = False,
+    ):
         self.repo_path = os.path.abspath(repo_path)
+        # Joined to "/"-separated relative paths by plain concatenation; Windows
+        # accepts "/" as a separator, so the result opens fine everywhere
+        self._path_prefix = os.path.join(self.repo_path, "")
+        # A directory, or a file pointing at one (linked worktrees and submodules)
+        self._git_dir = self._path_prefix + ".git"
         self.raw_mode = raw_mode
+        # Files above this many bytes are skipped (generated dumps, bundles)
+        self.max_size = max_size
+        # Worker processes for analysis; 1 keeps everything on threads in this process,
+        # None picks one per CPU when the files are large enough to be worth it
+        self.jobs = jobs
+        # Reader threads when analysis stays in this process
+        self.io_threads = io_threads
+        # False never spawns Git: Git repos are walked like any other tree, with
+        # ignore rules matched in memory only
+        self.git_verify = git_verify
+        # Walk directories and read files in inode order, which on most filesystems
+        # follows their placement on disk: fewer seeks on spinning or cold storage
+        self.locality = locality
         self.was_interrupted = False
+        # Files analyzed so far in the current scan; read by the spinner thread
+        self.files_done = 0
         
-        # Load default patterns for "Eager Pruning" (fast skip)
-        self.simple_patterns = []
+        # Base rules (defaults, git excludes) that apply to the whole tree.
+        # .gitignore files are picked up per directory during the walk.
+        self.base_rules: Tuple[IgnoreRules, ...] = ()
+        # .gitignore path -> ((mtime_ns, size), compiled rules)
+        self._rules_cache: Dict[str, Tuple[Tuple[int, int], Optional[IgnoreRules]]] = {}
         if not self.raw_mode:
-            self.simple_patterns = self._load_default_patterns()
+            self.base_rules = self._load_default_patterns()
 
-    def _load_default_patterns(self) -> List[Tuple[str, bool, bool]]:
-        # Load defaults + root .gitignore for the "fast prune" phase
-        patterns = DEFAULT_IGNORE_PATTERNS[:]
-        gitignore_path = os.path.join(self.repo_path, ".gitignore")
-        if os.path.exists(gitignore_path):
-            try:
-                with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith("#"):
-                            patterns.append(line)
-            except PermissionError:
-                pass
-        
-        # Compile them for fnmatch
-        compiled = []
-        for raw in patterns:
-            p = raw.strip()
-            is_dir = p.endswith("/")
-            if is_dir: p = p[:-1]
-            anchored = p.startswith("/")
-            if anchored: p = p[1:]
-            p = p.replace("\\", "/")
-            compiled.append((p, is_dir, anchored))
-        return compiled
-
-    def _simple_gitignore_match(self, relpath: str, patterns: List[Tuple[str, bool, bool]]) -> bool:
-        if not patterns: return False
-        for pat, is_dir, anchored in patterns:
-            if anchored:
-                if fnmatch.fnmatch(relpath, pat) or fnmatch.fnmatch(relpath, pat + "/"):
-                    return (relpath == pat or relpath.startswith(pat + "/")) if is_dir else True
-            elif fnmatch.fnmatch(relpath, pat) or fnmatch.fnmatch(os.path.basename(relpath), pat):
-                return (relpath == pat or relpath.startswith(pat + "/")) if is_dir else True
+    def _load_default_patterns(self) -> Tuple[IgnoreRules, ...]:
+        # Lowest priority first: built-in defaults, global excludes, info/exclude
+        chain = [IgnoreRules(DEFAULT_IGNORE_PATTERNS)]
+        if self._is_git_repo():
+            xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+            for path in (
+                os.path.join(xdg, "git", "ignore"),
+                os.path.join(self._git_dir, "info", "exclude"),
+            ):
+                lines = self._read_ignore_file(path)
+                if lines:
+                    chain.append(IgnoreRules(lines))
+        return tuple(chain)
+
+    def _load_dir_rules(self, entry: os.DirEntry, rel_dir: str) -> Optional[IgnoreRules]:
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        return self._cached_rules(entry.path, rel_dir, (st.st_mtime_ns, st.st_size))
+
+    def _cached_rules(self, path: str, rel_dir: str, key: Tuple[int, int]) -> Optional[IgnoreRules]:
+        # Compiled once per directory; later scans reuse it until the file changes
+        cached = self._rules_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        lines = self._read_ignore_file(path)
+        rules = IgnoreRules(lines, rel_dir) if lines else None
+        self._rules_cache[path] = (key, rules)
+        return rules
+
+    @staticmethod
+    def _read_ignore_file(path: str) -> Optional[List[str]]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # Git skips a UTF-8 byte order mark, as left by some Windows editors
+        if data.startswith(b"\xef\xbb\xbf"):
+            data = data[3:]
+        if not data:
+            return None
+        # One read and one split in C; bytes.splitlines() only breaks on \n, \r and \r\n.
+        # Blank and comment lines never become rules, so they are not decoded at all.
+        return [
+            line.decode("utf-8", "ignore")
+            for line in data.splitlines()
+            if line and not line.startswith(b"#")
+        ]
+
+    @staticmethod
+    def _is_ignored(relpath: str, name: str, is_dir: bool, chain: Tuple[IgnoreRules, ...]) -> bool:
+        # Deeper ignore files take precedence over their parents
+        for rules in reversed(chain):
+            # Only anchored rules read the path, so the rest skip building it
+            sub = relpath[len(rules.base) + 1 :] if rules.base and rules.anchored else relpath
+            verdict = rules.match(sub, name, is_dir)
+            if verdict is not None:
+                return verdict
         return False
 
     def _is_git_repo(self) -> bool:
-        return os.path.isdir(os.path.join(self.repo_path, ".git"))
+        return os.path.exists(self._git_dir)
 
-    def _git_check_ignore(self, relpaths: List[str]) -> Set[str]:
-        if not relpaths: return set()
+    def _collect_and_filter_files(self) -> List[Tuple[str, LangRule]]:
+        """
+        Returns (rel_path, rule) pairs for every file that should be counted.
+        Git repos are listed by Git itself; anything else is walked.
+        """
+        if not self.raw_mode and self.git_verify and self._is_git_repo():
+            try:
+                files = self._git_ls_files()
+            except KeyboardInterrupt:
+                self.was_interrupted = True
+                return []
+            if files is not None:
+                return self._by_inode(files) if self.locality else files
+        files = self._walk_files()
+        return self._by_inode(files) if self.locality else files
+
+    def _by_inode(self, files: List[Tuple[str, LangRule]]) -> List[Tuple[str, LangRule]]:
+        # One stat per file: inode tables are small and clustered, while the reads
+        # this orders are what would otherwise seek across the disk
+        prefix = self._path_prefix
+
+        def inode(item: Tuple[str, LangRule]) -> int:
+            try:
+                return os.stat(prefix + item[0]).st_ino
+            except OSError:
+                return 0
+
+        files.sort(key=inode)
+        return files
+
+    def _git_ls_files(self) -> Optional[List[Tuple[str, LangRule]]]:
+        """
+        Tracked + untracked-but-not-ignored files in one `git ls-files` call, which
+        replaces both the walk and any per-path ignore checks.
+        Returns None when Git is unavailable so the caller can fall back to walking.
+        """
         try:
-            # Batch query Git for accuracy
-            input_bytes = "\0".join(relpaths).encode("utf-8")
-            proc = subprocess.run(
-                ["git", "check-ignore", "--stdin", "-z"],
-                input=input_bytes,
+            proc = subprocess.Popen(
+                ["git", "ls-files", "-co", "--exclude-standard", "-z"],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
                 cwd=self.repo_path,
-                timeout=15, # Generous timeout for large repos
             )
-            if proc.returncode not in (0, 1) or not proc.stdout:
-                return set()
-            parts = [p.decode("utf-8") for p in proc.stdout.split(b"\0") if p]
-            return set(parts)
-        except Exception:
-            return set()
+        except OSError:
+            return None
+
+        # Git lists committed junk too, so the built-in prune list still applies
+        pruned = {"": False}
+        # rel_dir -> ignore chain for its entries, .gitignore files included
+        chains: Dict[str, Tuple[IgnoreRules, ...]] = {}
+
+        def chain_of(rel_dir: str) -> Tuple[IgnoreRules, ...]:
+            chain = chains.get(rel_dir)
+            if chain is None:
+                chain = chain_of(rel_dir.rpartition("/")[0]) if rel_dir else self.base_rules
+                path = self._path_prefix + (rel_dir + "/" if rel_dir else "") + ".gitignore"
+                key = _stat_key(path)
+                rules = self._cached_rules(path, rel_dir, key) if key is not None else None
+                if rules:
+                    chain = chain + (rules,)
+                chains[rel_dir] = chain
+            return chain
+
+        # Only the built-in patterns: Git has already applied the ignore files, and
+        # to untracked files only, so applying them again would drop tracked ones
+        defaults = self.base_rules[:1]
+
+        def is_excluded(rel_path: str, name: str, is_dir: bool, rel_dir: str) -> bool:
+            # The repo's own rules are only read when the defaults would drop a path,
+            # in case a "!" re-includes it as in the walk
+            return self._is_ignored(rel_path, name, is_dir, defaults) and self._is_ignored(
+                rel_path, name, is_dir, chain_of(rel_dir)
+            )
 
-    def _collect_and_filter_files(self, callback=None) -> List[str]:
+        def is_pruned(rel_dir: str) -> bool:
+            hit = pruned.get(rel_dir)
+            if hit is None:
+                parent, _, name = rel_dir.rpartition("/")
+                hit = is_pruned(parent) or is_excluded(rel_dir, name, True, parent)
+                pruned[rel_dir] = hit
+            return hit
+
+        all_files = []
+        tail = b""
+        previous = None
+        lang_rule = LANG_RULES_B.get
+        try:
+            # Filtered chunk by chunk while Git is still listing, instead of after it exits
+            for chunk in iter(lambda: proc.stdout.read(65536), b""):
+                entries = (tail + chunk).split(b"\0")
+                tail = entries.pop()
+                for raw in entries:
+                    # A conflicted path is listed once per index stage, one after another
+                    if raw == previous:
+                        continue
+                    previous = raw
+                    # Most listed files are not code, so reject them on the raw bytes,
+                    # before paying for a decode and a split
+                    dot = raw.rfind(b".")
+                    rule = lang_rule(raw[dot:])
+                    if rule is None:
+                        rule = lang_rule(raw[dot:].lower())
+                        if rule is None:
+                            continue
+                    # Dotfiles like ".py" have no extension
+                    if dot == 0 or raw[dot - 1] == 0x2F:
+                        continue
+
+                    rel_path = os.fsdecode(raw)
+                    rel_dir, _, name = rel_path.rpartition("/")
+                    if is_pruned(rel_dir) or is_excluded(rel_path, name, False, rel_dir):
+                        continue
+                    all_files.append((rel_path, rule))
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+
+        if returncode != 0:
+            return None
+
+        # A submodule is listed only as its gitlink entry, so Git is asked again inside it
+        for rel_dir in self._submodule_paths():
+            parent, _, name = rel_dir.rpartition("/")
+            if is_pruned(parent) or is_excluded(rel_dir, name, True, parent):
+                continue
+            sub = LocrEngine(self._path_prefix + rel_dir, git_verify=self.git_verify)
+            files = sub._collect_and_filter_files()
+            if sub.was_interrupted:
+                raise KeyboardInterrupt
+            rel_prefix = rel_dir + "/"
+            all_files.extend((rel_prefix + p, rule) for p, rule in files)
+        return all_files
+
+    def _submodule_paths(self) -> List[str]:
+        """Submodule directories declared in .gitmodules, relative to the root."""
+        if not os.path.isfile(self._path_prefix + ".gitmodules"):
+            return []
+        try:
+            out = subprocess.run(
+                ["git", "config", "-z", "-f", ".gitmodules", "--get-regexp", r"^submodule\..*\.path$"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                cwd=self.repo_path,
+            ).stdout
+        except OSError:
+            return []
+        # Each entry is "key\nvalue\0"
+        return [
+            os.fsdecode(entry.partition(b"\n")[2]).strip("/")
+            for entry in out.split(b"\0")
+            if b"\n" in entry
+        ]
+
+    def _walk_files(self) -> List[Tuple[str, LangRule]]:
         """
-        Phase 1: Collect all files, but eager-prune junk folders.
-        Phase 2: Use Git to filter the survivors.
+        Walks the tree, matching every entry against the ignore rules in scope.
+        Ignored directories are pruned before we ever enter them.
         """
-        all_rel_paths = []
-        
-        # --- PHASE 1: WALK & PRUNE ---
+        all_files = []
+        # (directory, its "/"-separated path relative to the root, ignore chain)
+        stack = [(self.repo_path, "", self.base_rules)]
+        # One probe per file yields the language rule itself, not a membership test
+        # followed by a second lookup
+        lang_rule = LANG_RULES.get
+        # Bound once: these are consulted for every entry in the tree
+        raw_mode = self.raw_mode
+        is_ignored = self._is_ignored
+        # chain -> (directory verdicts, file verdicts) by name. Only kept for chains
+        # whose rules never look past the basename; names like "src", "tests" or
+        # "__init__.py" then get one answer however often they recur.
+        name_verdicts: Dict[Tuple[IgnoreRules, ...], Tuple[Dict[str, bool], Dict[str, bool]]] = {}
+
         try:
-            for dirpath, dirnames, filenames in os.walk(self.repo_path, topdown=True):
-                if callback: callback()
-                
-                rel_dir = os.path.relpath(dirpath, self.repo_path)
-                if rel_dir == ".": rel_dir = ""
-                else: rel_dir = rel_dir.replace(os.sep, "/")
-
-                if not self.raw_mode:
-                    # Eager Pruning: Remove directories that match simple patterns
-                    # This prevents us from walking into node_modules or .git
-                    active_dirs = []
-                    for d in dirnames:
-                        if d == ".git": continue
-                        path_to_check = (rel_dir + "/" + d) if rel_dir else d
-                        if not self._simple_gitignore_match(path_to_check, self.simple_patterns):
-                            active_dirs.append(d)
-                    dirnames[:] = active_dirs
-
-                for f in filenames:
-                    # Basic extension check (optimization: don't track binary files)
-                    ext = os.path.splitext(f)[1].lower()
-                    if ext not in LANGUAGES:
+            while stack:
+                dirpath, rel_dir, chain = stack.pop()
+
+                try:
+                    with os.scandir(dirpath) as it:
+                        entries = list(it)
+                except OSError:
+                    continue
+                if self.locality:
+                    # readdir order is hash order on many filesystems. The inode comes
+                    # with each entry on POSIX; descending, since the stack pops in reverse.
+                    entries.sort(key=os.DirEntry.inode, reverse=True)
+
+                if not raw_mode:
+                    for entry in entries:
+                        if entry.name == ".gitignore":
+                            rules = self._load_dir_rules(entry, rel_dir)
+                            if rules:
+                                chain = chain + (rules,)
+                            break
+                # Built-in prune names need no rule matching, unless a "!" in scope could re-include one
+                prune_names = frozenset() if any(rules.negates for rules in chain) else _PRUNE_NAMES
+                # Child paths are built by appending names, never derived from entry.path
+                rel_prefix = rel_dir + "/" if rel_dir else ""
+                if raw_mode or any(rules.anchored for rules in chain):
+                    dir_verdicts = file_verdicts = None
+                else:
+                    verdicts = name_verdicts.get(chain)
+                    if verdicts is None:
+                        verdicts = name_verdicts[chain] = ({}, {})
+                    dir_verdicts, file_verdicts = verdicts
+
+                for entry in entries:
+                    name = entry.name
+
+                    # DirEntry caches the d_type from readdir, so this is usually free.
+                    # Like os.walk, never follow directory symlinks.
+                    if entry.is_dir(follow_symlinks=False):
+                        rel_path = rel_prefix + name
+                        if not raw_mode:
+                            # Eager Pruning: ignored directories are never entered.
+                            # This prevents us from walking into node_modules or .git
+                            if name == ".git" or name in prune_names:
+                                continue
+                            if dir_verdicts is None:
+                                ignored = is_ignored(rel_path, name, True, chain)
+                            else:
+                                ignored = dir_verdicts.get(name)
+                                if ignored is None:
+                                    ignored = dir_verdicts[name] = is_ignored(rel_path, name, True, chain)
+                            if ignored:
+                                continue
+                        stack.append((entry.path, rel_path, chain))
+                        continue
+
+                    # Basic extension check (optimization: don't track binary files).
+                    # Most extensions are already lowercase, so only fold on a miss.
+                    dot = name.rfind(".")
+                    if dot <= 0:
                         continue
-                        
-                    rel_path = (rel_dir + "/" + f if rel_dir else f).replace(os.sep, "/")
-                    
-                    if not self.raw_mode and self._simple_gitignore_match(rel_path, self.simple_patterns):
+                    rule = lang_rule(name[dot:])
+                    if rule is None:
+                        rule = lang_rule(name[dot:].lower())
+                        if rule is None:
+                            continue
+
+                    # Only regular files (or links to them): opening a FIFO would block
+                    # forever. Checked after the extension, so the stat it may cost is rare.
+                    if not entry.is_file():
                         continue
-                        
-                    all_rel_paths.append(rel_path)
+
+                    rel_path = rel_prefix + name
+                    if file_verdicts is not None:
+                        ignored = file_verdicts.get(name)
+                        if ignored is None:
+                            ignored = file_verdicts[name] = is_ignored(rel_path, name, False, chain)
+                        if ignored:
+                            continue
+                    elif not raw_mode and is_ignored(rel_path, name, False, chain):
+                        continue
+
+                    all_files.append((rel_path, rule))
 
         except KeyboardInterrupt:
             self.was_interrupted = True
             return []
 
-        if self.raw_mode or not all_rel_paths:
-            return all_rel_paths
+        return all_files
 
-        # --- PHASE 2: GIT ACCURACY ---
-        final_list = []
-        ignored_by_git = set()
-        
-        if self._is_git_repo():
-            ignored_by_git = self._git_check_ignore(all_rel_paths)
-            
-        for p in all_rel_paths:
-            if p not in ignored_by_git:
-                final_list.append(p)
-                
-        return final_list
-
-    def scan(self, callback=None) -> dict:
-        results = defaultdict(
-            lambda: {
-                "files": 0,
-                "blank": 0,
-                "comment": 0,
-                "code": 0,
-                "color": Colors.WHITE,
-            }
-        )
+    def scan(self) -> dict:
+        counts = _new_counts()
         self.was_interrupted = False
+        self.files_done = 0
 
         try:
             # Step 1: Get the clean list of files (Pruned + Git Verified)
-            valid_files = self._collect_and_filter_files(callback)
-
-            # Step 2: Analyze them
-            for rel_path in valid_files:
-                if self.was_interrupted: break
-                if callback: callback()
-
-                full_path = os.path.join(self.repo_path, rel_path)
-                ext = os.path.splitext(rel_path)[1].lower()
-                
-                if ext in LANGUAGES:
-                    lang_def = LANGUAGES[ext]
-                    b, c, k = self._analyze_file(full_path, lang_def)
-
-                    name = lang_def["name"]
-                    results[name]["files"] += 1
-                    results[name]["blank"] += b
-                    results[name]["comment"] += c
-                    results[name]["code"] += k
-                    results[name]["color"] = lang_def.get("color", Colors.WHITE)
+            valid_files = self._collect_and_filter_files()
+
+            jobs = self.jobs if self.jobs is not None else os.cpu_count() or 1
+            if jobs > 1 and len(valid_files) >= jobs * PREFETCH_BATCH and (
+                self.jobs is not None or self._average_size(valid_files) >= PROCESS_MIN_AVG_SIZE
+            ):
+                # Step 2: Analyze them on every core. Round-robin shards balance out
+                # directories of big files, and workers send back one buffer of totals each.
+                shards = [
+                    (self.repo_path, self.max_size, valid_files[i :: jobs])
+                    for i in range(jobs)
+                ]
+                n = len(LANG_NAMES)
+                with multiprocessing.Pool(jobs, initializer=_ignore_sigint) as pool:
+                    for raw in pool.imap_unordered(_analyze_shard, shards, chunksize=1):
+                        totals = array("q")
+                        totals.frombytes(raw)
+                        # Same layout as counts, so each metric merges with one C-level map
+                        for m, metric in enumerate(counts):
+                            metric[:] = array("q", map(add, metric, totals[m * n : (m + 1) * n]))
+                        self.files_done += sum(totals[:n])
+            else:
+                batches = [
+                    valid_files[i : i + PREFETCH_BATCH]
+                    for i in range(0, len(valid_files), PREFETCH_BATCH)
+                ]
+
+                if self.io_threads <= 1 or len(batches) <= 1:
+                    # Step 2: Analyze them here; with no reads to overlap, a pool only adds overhead
+                    for batch in batches:
+                        stats = self._analyze_batch(batch)
+                        _tally(counts, stats)
+                        self.files_done += len(stats)
+                else:
+                    # Step 2: Analyze them. Reads release the GIL, so threads overlap disk I/O.
+                    with ThreadPoolExecutor(max_workers=self.io_threads) as pool:
+                        futures = [pool.submit(self._analyze_batch, batch) for batch in batches]
+                        try:
+                            for future in as_completed(futures):
+                                stats = future.result()
+                                _tally(counts, stats)
+                                self.files_done += len(stats)
+                        except KeyboardInterrupt:
+                            # Drop everything still queued; only in-flight reads are awaited
+                            for future in futures:
+                                future.cancel()
+                            raise
 
         except KeyboardInterrupt:
             self.was_interrupted = True
 
+        files, blank, comment, code = counts
+        results = {}
+        for lid, name in enumerate(LANG_NAMES):
+            if files[lid]:
+                results[name] = {
+                    "files": files[lid],
+                    "blank": blank[lid],
+                    "comment": comment[lid],
+                    "code": code[lid],
+                    "color": LANG_COLORS[lid],
+                }
         return results
 
-    def _analyze_file(self, filepath: str, lang_def: dict) -> Tuple[int, int, int]:
-        blank = 0
-        comment = 0
-        code = 0
-        in_block = False
-        single = lang_def.get("single")
-        m_start, m_end = lang_def.get("multi") or (None, None)
+    def _average_size(self, items: List[Tuple[str, LangRule]]) -> float:
+        """Mean size of an evenly spaced sample of files, to judge the workload."""
+        sizes = []
+        for rel_path, _ in items[:: max(1, len(items) // SIZE_SAMPLE)]:
+            try:
+                sizes.append(os.stat(self._path_prefix + rel_path).st_size)
+            except OSError:
+                pass
+        return sum(sizes) / len(sizes) if sizes else 0.0
+
+    def _analyze_batch(self, items: List[Tuple[str, LangRule]]) -> List[Tuple[int, int, int, int]]:
+        """
+        Opens a whole batch up front and asks the kernel to read ahead on all of it,
+        so cold or networked storage serves many files at once instead of one by one.
+        """
+        opened = []
+        stats = []
+        prefix = self._path_prefix
+
+        def drain() -> None:
+            for fd, size, (lid, single, m_start, m_end) in opened:
+                b, c, k = self._analyze_file(fd, size, single, m_start, m_end)
+                stats.append((lid, b, c, k))
+            while opened:
+                os.close(opened.pop()[0])
 
         try:
-            with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    stripped = line.strip()
-                    if not stripped:
-                        blank += 1
-                        continue
-                    if in_block:
-                        comment += 1
-                        if m_end and m_end in line:
-                            in_block = False
-                        continue
-                    if m_start and stripped.startswith(m_start):
-                        comment += 1
-                        if m_end and m_end not in stripped[len(m_start) :]:
-                            in_block = True
-                        continue
-                    if single and stripped.startswith(single):
-                        comment += 1
-                        continue
-                    code += 1
+            for rel_path, rule in items:
+                waited = 0
+                while True:
+                    try:
+                        # A bare descriptor: files are read whole in one call, so a file
+                        # object and its read buffer would only be set up and torn down
+                        fd = os.open(prefix + rel_path, _OPEN_FLAGS)
+                        break
+                    except OSError as e:
+                        if e.errno not in _FD_EXHAUSTED:
+                            # Vanished since listing (e.g. deleted but still tracked)
+                            fd = None
+                            break
+                        # Out of descriptors: count and release this batch's, or give
+                        # the other reader threads a moment to release theirs
+                        if opened:
+                            drain()
+                        elif waited < 100:
+                            time.sleep(0.01)
+                            waited += 1
+                        else:
+                            raise
+                if fd is None:
+                    continue
+                # fstat on an open fd is cheap, and works for walked and Git-listed files alike
+                st = os.fstat(fd)
+                # Directories open fine as descriptors too (e.g. a listed submodule)
+                if not stat.S_ISREG(st.st_mode) or (self.max_size and st.st_size > self.max_size):
+                    os.close(fd)
+                    continue
+                size = st.st_size
+                # Mapped files are streamed window by window with their own readahead
+                # hint; asking for all of a huge file at once would only evict other data
+                if size <= MMAP_THRESHOLD:
+                    _prefetch(fd)
+                opened.append((fd, size, rule))
+
+            drain()
+            return stats
+        finally:
+            for fd, _, _ in opened:
+                os.close(fd)
+
+    def _analyze_file(self, fd: int, size: int, single: bytes, m_start: bytes, m_end: bytes) -> Tuple[int, int, int]:
+        try:
+            if size > MMAP_THRESHOLD:
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                    if _MADV_SEQUENTIAL is not None:
+                        # The map is read front to back once, so let readahead run further
+                        mm.madvise(_MADV_SEQUENTIAL)
+                    return count_lines(mm, single, m_start, m_end)
+            data = os.read(fd, size)
+            # Only a file that shrank, or some network filesystems, return less
+            # than fstat promised; keep going until the size or end of file
+            while len(data) < size:
+                chunk = os.read(fd, size - len(data))
+                if not chunk:
+                    break
+                data += chunk
         except Exception:
             return 0, 0, 0
 
-        return blank, comment, code
+        return count_lines(data, single, m_start, m_end)
+
+
+def _ignore_sigint() -> None:
+    # Ctrl+C reaches the whole process group; only the parent should handle it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _new_counts() -> List[array]:
+    """Zeroed (files, blank, comment, code) counters: one array per metric, indexed by language id."""
+    return [array("q", [0]) * len(LANG_NAMES) for _ in range(4)]
+
+
+def _tally(counts: List[array], stats: List[Tuple[int, int, int, int]]) -> None:
+    files, blank, comment, code = counts
+    for lid, b, c, k in stats:
+        files[lid] += 1
+        blank[lid] += b
+        comment[lid] += c
+        code[lid] += k
+
+
+def _analyze_shard(args: Tuple[str, Optional[int], List[Tuple[str, LangRule]]]) -> bytes:
+    """
+    Process pool worker: analyzes one shard and returns its counters (see
+    _new_counts) back to back, as the raw bytes of one array("q").
+    """
+    repo_path, max_size, items = args
+    # raw_mode skips loading ignore rules, which a worker never needs
+    engine = LocrEngine(repo_path, raw_mode=True, max_size=max_size)
+    counts = _new_counts()
+    for i in range(0, len(items), PREFETCH_BATCH):
+        _tally(counts, engine._analyze_batch(items[i : i + PREFETCH_BATCH]))
+    # One flat buffer pickles as a single bytes object rather than a tuple per language
+    return b"".join(metric.tobytes() for metric in counts)
+
+
+# Byte values bytes.strip() treats as whitespace
+_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+# Comment marker -> the pair of regexes from _line_starts()
+_LINE_STARTS: Dict[bytes, Tuple["re.Pattern", "re.Pattern"]] = {}
+
+
+def _windows(buf):
+    """
+    Yields a bytes buffer whole, or an mmap as newline-aligned windows, so only
+    one window of a mapped file is ever copied out. Pages already copied out are
+    dropped from the mapping, so a huge file doesn't stay resident as it's read.
+    """
+    if isinstance(buf, bytes):
+        yield buf
+        return
+
+    start = 0
+    released = 0
+    end = len(buf)
+    while start < end:
+        # Cut just after a "\n", which also keeps every "\r\n" pair in one window;
+        # a window with no "\n" at all grows until it finds one
+        stop = end
+        if start + MMAP_WINDOW < end:
+            cut = buf.rfind(b"\n", start, start + MMAP_WINDOW)
+            if cut < 0:
+                cut = buf.find(b"\n", start + MMAP_WINDOW)
+            if cut >= 0:
+                stop = cut + 1
+        window = buf[start:stop]
+        # The page cache still holds them; this only unmaps them from the process
+        done = stop - stop % mmap.PAGESIZE
+        if _MADV_DONTNEED is not None and done > released:
+            buf.madvise(_MADV_DONTNEED, released, done - released)
+            released = done
+        yield window
+        start = stop
+
+
+def _line_starts(marker: bytes) -> Tuple["re.Pattern", "re.Pattern"]:
+    """
+    Regexes for a line that begins (after indentation) with `marker`: one anchored
+    at a given position, and one finding such lines by the "\n" before them.
+    """
+    found = _LINE_STARTS.get(marker)
+    if found is None:
+        indented = rb"[ \t\x0b\x0c]*" + re.escape(marker)
+        found = _LINE_STARTS[marker] = (re.compile(indented), re.compile(rb"\n" + indented))
+    return found
+
+
+def _count_blank(lines: List[bytes]) -> int:
+    return lines.count(b"") + sum(map(bytes.isspace, lines))
+
+
+def _count_starting(window: bytes, starts: Tuple["re.Pattern", "re.Pattern"], pos: int, stop: int) -> int:
+    """Lines in window[pos:stop] (pos at a line start) matching a _line_starts() pair."""
+    first, following = starts
+    # The line at pos is found through its preceding "\n", unless it is the first
+    n = len(following.findall(window, pos - 1 if pos else 0, stop))
+    if pos == 0 and first.match(window, 0, stop) is not None:
+        n += 1
+    return n
+
+
+def count_lines(buf: bytes, single: bytes, m_start: bytes, m_end: bytes) -> Tuple[int, int, int]:
+    """
+    Classifies every line of a raw file buffer as (blank, comment, code).
+    Markers are bytes; pass b"" for syntax the language does not have.
+    The buffer may also be an mmap of the file.
+    """
+    blank = 0
+    comment = 0
+    code = 0
+    in_block = False
+    # Looked up once per file, not once per run of lines
+    comment_starts = _line_starts(single) if single else None
+    block_starts = _line_starts(m_start) if m_start else None
+
+    for window in _windows(buf):
+        if b"\r" in window and window.count(b"\r") != window.count(b"\r\n"):
+            # A lone "\r" ends a line for splitlines() but not for the searches
+            # below, so such (rare) windows are walked line by line
+            for line in window.splitlines():
+                # isspace() is a C scan with no allocation; only indented lines get copied
+                if not line or line.isspace():
+                    blank += 1
+                    continue
+                if in_block:
+                    comment += 1
+                    if m_end in line:
+                        in_block = False
+                    continue
+
+                stripped = line.lstrip() if line[0] in _WHITESPACE else line
+                if m_start and stripped.startswith(m_start):
+                    comment += 1
+                    if m_end and m_end not in stripped[len(m_start) :]:
+                        in_block = True
+                elif single and stripped.startswith(single):
+                    comment += 1
+                else:
+                    code += 1
+            continue
+
+        # No Python loop over lines: regex and find() jump from one block comment
+        # to the next, and the runs of lines in between are classified wholesale.
+        # Outside blocks a line is only blank, a line comment or code, so one
+        # splitlines() plus C-level counts settle a whole run.
+        blocks = block_starts is not None and (in_block or m_start in window)
+        if blocks:
+            opens_first, opens_next = block_starts
+        end = len(window)
+        pos = 0
+        while pos < end:
+            if in_block:
+                close = window.find(m_end, pos)
+                if close < 0:
+                    stop = end
+                else:
+                    eol = window.find(b"\n", close)
+                    stop = end if eol < 0 else eol + 1
+                    in_block = False
+                lines = window[pos:stop].splitlines()
+                b = _count_blank(lines)
+                blank += b
+                comment += len(lines) - b
+                pos = stop
+                continue
+
+            m = None
+            opener = end
+            if blocks:
+                m = opens_first.match(window) if pos == 0 else None
+                if m is not None:
+                    opener = 0
+                else:
+                    m = opens_next.search(window, pos - 1 if pos else 0)
+                    if m is not None:
+                        opener = m.start() + 1
+            if opener > pos:
+                lines = window[pos:opener].splitlines()
+                b = _count_blank(lines)
+                c = _count_starting(window, comment_starts, pos, opener) if comment_starts else 0
+                blank += b
+                comment += c
+                code += len(lines) - b - c
+            if m is None:
+                break
+
+            comment += 1
+            eol = window.find(b"\n", m.end())
+            stop = end if eol < 0 else eol + 1
+            if m_end and window.find(m_end, m.end(), stop) < 0:
+                in_block = True
+            pos = stop
+
+    return blank, comment, code
 
 
 # =============================================================================
@@ -291,37 +1132,43 @@ class LocrEngine:
 # =============================================================================
 
 
-def generate_report(
-    results: dict, elapsed_time: float, use_color: bool, interrupted: bool, show_stats: bool
-) -> List[str]:
-    lines = []
+def _style_rows(rows: List[Tuple[str, str]], use_color: bool) -> Iterator[str]:
+    """
+    Styles (color, text) table rows into display strings, lazily. Picks the
+    colored or plain form once for the whole table rather than calling
+    Colors.style per row.
+    """
+    if use_color:
+        reset = Colors.RESET
+        return (f"{color}{text}{reset}" for color, text in rows)
+    return (text for _, text in rows)
 
+
+def iter_report(
+    results: dict, elapsed_time: float, use_color: bool, interrupted: bool, show_stats: bool
+) -> Iterator[str]:
+    """
+    Yields the report one line at a time (without newlines), so callers can
+    stream it to their destination instead of building the whole list first.
+    """
     if interrupted:
-        lines.append("")
-        lines.append(
-            Colors.style(
-                "⚠ Scan interrupted. Showing partial results...",
-                Colors.YELLOW,
-                use_color,
-            )
+        yield ""
+        yield Colors.style(
+            "⚠ Scan interrupted. Showing partial results...",
+            Colors.YELLOW,
+            use_color,
         )
 
     if not results:
-        return lines + ["No code files found."]
+        yield "No code files found."
+        return
 
-    # 1. Pre-calculate Totals
-    total_files = 0
+    # 1. Totals: file shares need the file count up front; line totals are
+    # summed while the rows are rendered
+    total_files = sum(s["files"] for s in results.values())
     total_blank = 0
     total_comment = 0
     total_code = 0
-    
-    for s in results.values():
-        total_files += s["files"]
-        total_blank += s["blank"]
-        total_comment += s["comment"]
-        total_code += s["code"]
-        
-    grand_total_lines = total_blank + total_comment + total_code
     safe_total_files = total_files if total_files > 0 else 1
 
     sorted_stats = sorted(results.items(), key=lambda x: x[1]["code"], reverse=True)
@@ -340,16 +1187,20 @@ def generate_report(
     sep = "=" * content_width
     thin_sep = "-" * content_width
 
-    lines.append("")
-    lines.append(Colors.style(sep, Colors.WHITE, use_color))
+    yield ""
+    yield Colors.style(sep, Colors.WHITE, use_color)
 
     # 3. Build Table
     if show_stats:
         # === DETAILED VIEW (WITH %) ===
-        lines.append(Colors.style(header_fmt.format("Language", "Files", "Blank", "Comment", "Code"), Colors.BOLD, use_color))
-        lines.append(Colors.style(thin_sep, Colors.WHITE, use_color))
+        yield Colors.style(header_fmt.format("Language", "Files", "Blank", "Comment", "Code"), Colors.BOLD, use_color)
+        yield Colors.style(thin_sep, Colors.WHITE, use_color)
 
+        rows = []
         for lang, s in sorted_stats:
+            total_blank += s["blank"]
+            total_comment += s["comment"]
+            total_code += s["code"]
             l_lines = s["blank"] + s["comment"] + s["code"]
             safe_lines = l_lines if l_lines > 0 else 1
             
@@ -358,22 +1209,24 @@ def generate_report(
             c_pct = (s["comment"] / safe_lines) * 100
             k_pct = (s["code"] / safe_lines) * 100
             
-            lines.append(Colors.style(row_fmt.format(
+            rows.append((s["color"], row_fmt.format(
                 lang, 
                 f"{s['files']} ({f_pct:.0f}%)", 
                 f"{s['blank']} ({b_pct:.0f}%)", 
                 f"{s['comment']} ({c_pct:.0f}%)", 
                 f"{s['code']} ({k_pct:.0f}%)"
-            ), s["color"], use_color))
+            )))
+        yield from _style_rows(rows, use_color)
             
         # Global Totals
+        grand_total_lines = total_blank + total_comment + total_code
         safe_global = grand_total_lines if grand_total_lines > 0 else 1
         gt_b_pct = (total_blank / safe_global) * 100
         gt_c_pct = (total_comment / safe_global) * 100
         gt_k_pct = (total_code / safe_global) * 100
         
-        lines.append(Colors.style(thin_sep, Colors.WHITE, use_color))
-        lines.append(Colors.style(row_fmt.format(
+        yield Colors.style(thin_sep, Colors.WHITE, use_color)
+        yield (Colors.style(row_fmt.format(
             "TOTAL", 
             f"{total_files} (100%)", 
             f"{total_blank} ({gt_b_pct:.0f}%)", 
@@ -383,26 +1236,33 @@ def generate_report(
 
     else:
         # === SIMPLE VIEW (NO %) ===
-        lines.append(Colors.style(header_fmt.format("Language", "Files", "Blank", "Comment", "Code"), Colors.BOLD, use_color))
-        lines.append(Colors.style(thin_sep, Colors.WHITE, use_color))
+        yield Colors.style(header_fmt.format("Language", "Files", "Blank", "Comment", "Code"), Colors.BOLD, use_color)
+        yield Colors.style(thin_sep, Colors.WHITE, use_color)
 
+        rows = []
         for lang, s in sorted_stats:
-            lines.append(Colors.style(header_fmt.format(
-                lang, s['files'], s['blank'], s['comment'], s['code']
-            ), s["color"], use_color))
-
-        lines.append(Colors.style(thin_sep, Colors.WHITE, use_color))
-        lines.append(Colors.style(header_fmt.format(
+            total_blank += s["blank"]
+            total_comment += s["comment"]
+            total_code += s["code"]
+            rows.append((s["color"], header_fmt.format(lang, s['files'], s['blank'], s['comment'], s['code'])))
+        yield from _style_rows(rows, use_color)
+
+        yield Colors.style(thin_sep, Colors.WHITE, use_color)
+        yield (Colors.style(header_fmt.format(
             "TOTAL", total_files, total_blank, total_comment, total_code
         ), Colors.BOLD, use_color))
 
     # --- FOOTER ---
-    lines.append(Colors.style(sep, Colors.WHITE, use_color))
+    yield Colors.style(sep, Colors.WHITE, use_color)
     time_str = f"Processed {total_files} files in {elapsed_time:.3f} seconds."
-    lines.append(Colors.style(time_str, Colors.CYAN, use_color))
-    lines.append("")
+    yield Colors.style(time_str, Colors.CYAN, use_color)
+    yield ""
 
-    return lines
+
+def generate_report(
+    results: dict, elapsed_time: float, use_color: bool, interrupted: bool, show_stats: bool
+) -> List[str]:
+    return list(iter_report(results, elapsed_time, use_color, interrupted, show_stats))
 
 
 def auto_out_name(target_path: str) -> str:
@@ -413,11 +1273,40 @@ def auto_out_name(target_path: str) -> str:
     return os.path.join(abs_target, f"{folder_name}_locr.txt")
 
 
+def write_report(lines: Iterable[str]) -> None:
+    """
+    Writes the report to stdout as one encoded block, skipping the per-write
+    encoding of the text layer. Falls back to it when stdout has no buffer.
+    """
+    text = "".join([line + "\n" for line in lines])
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        sys.stdout.write(text)
+        return
+
+    # Anything still queued in the text layer (e.g. the cursor escape) goes first
+    sys.stdout.flush()
+    buffer.write(text.encode(sys.stdout.encoding or "utf-8", sys.stdout.errors or "strict"))
+    buffer.flush()
+
+
 # =============================================================================
 # Main
 # =============================================================================
 
 
+def _megabytes(value: str) -> float:
+    """argparse type for --max-size: a size in MB, 0 or more."""
+    try:
+        mb = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    # Written this way round so NaN is rejected too
+    if not 0 <= mb < float("inf"):
+        raise argparse.ArgumentTypeError(f"must be a finite size of 0 or more, got {value}")
+    return mb
+
+
 def main():
     p = argparse.ArgumentParser(
         description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
@@ -427,6 +1316,27 @@ def main():
     p.add_argument("--raw", action="store_true", help="Ignore .gitignore rules")
     p.add_argument("--out", "-o", nargs="?", const=True, help="Write output to file")
     p.add_argument("--stats", "-s", action="store_true", help="Show percentage statistics")
+    p.add_argument(
+        "--max-size", type=_megabytes, default=2, metavar="MB",
+        help="Skip files larger than MB megabytes (0 = no limit, default: 2)",
+    )
+    p.add_argument(
+        "--no-git-verify", action="store_true",
+        help="Never run Git; match ignore rules in memory only",
+    )
+    p.add_argument(
+        "--jobs", "-j", type=int, default=None, metavar="N",
+        help="Analyze files in N processes (1 = single process, "
+        "default: one per CPU when files average 8 KB or more)",
+    )
+    p.add_argument(
+        "--io-threads", type=int, default=ANALYZE_WORKERS, metavar="N",
+        help=f"Reader threads for in-process analysis (default: {ANALYZE_WORKERS})",
+    )
+    p.add_argument(
+        "--locality", action="store_true",
+        help="Walk and read in inode order (faster on spinning disks and cold caches)",
+    )
 
     args = p.parse_args()
     target_path = os.path.abspath(args.path)
@@ -446,39 +1356,51 @@ def main():
         sys.stdout.flush()
 
     spinner = itertools.cycle(["|", "/", "-", "\\"])
-    last_spin = 0
-
-    def update_spinner():
-        nonlocal last_spin
-        if not spinner_active:
-            return
-        now = time.time()
-        if now - last_spin > 0.1:
+    spinner_done = threading.Event()
+    engine = None
+
+    def spin():
+        # Animates on its own thread, so the scan loops never pay for it; they only
+        # bump a counter, which is read here without any locking
+        while not spinner_done.wait(0.1):
+            done = engine.files_done if engine is not None else 0
+            progress = f" {done} files" if done else ""
             sys.stdout.write(
-                Colors.style(f"\r{msg} {next(spinner)}", Colors.CYAN, use_color)
+                Colors.style(f"\r{msg} {next(spinner)}{progress}", Colors.CYAN, use_color)
             )
             sys.stdout.flush()
-            last_spin = now
+
+    spinner_thread = threading.Thread(target=spin, daemon=True)
+
+    def stop_spinner():
+        if spinner_active:
+            spinner_done.set()
+            spinner_thread.join()
+            w = shutil.get_terminal_size().columns
+            sys.stdout.write(f"\r{' ' * (w - 1)}\r")
+            sys.stdout.flush()
 
     start_time = time.time()
 
     if spinner_active:
         sys.stdout.write(Colors.HIDE_CURSOR)
+        spinner_thread.start()
 
     try:
-        engine = LocrEngine(target_path, raw_mode=args.raw)
-        results = engine.scan(callback=update_spinner)
-        
-        if spinner_active:
-            w = shutil.get_terminal_size().columns
-            sys.stdout.write(f"\r{' ' * (w - 1)}\r")
-            sys.stdout.flush()
+        engine = LocrEngine(
+            target_path,
+            raw_mode=args.raw,
+            max_size=int(args.max_size * 1024 * 1024) or None,
+            jobs=None if args.jobs is None else max(1, args.jobs),
+            io_threads=max(1, args.io_threads),
+            git_verify=not args.no_git_verify,
+            locality=args.locality,
+        )
+        results = engine.scan()
+        stop_spinner()
 
     except Exception as e:
-        if spinner_active:
-            w = shutil.get_terminal_size().columns
-            sys.stdout.write(f"\r{' ' * (w - 1)}\r")
-            sys.stdout.flush()
+        stop_spinner()
         print(f"\nError: {e}")
         sys.exit(1)
     finally:
@@ -487,31 +1409,25 @@ def main():
 
     end_time = time.time()
 
-    report_lines = generate_report(
+    # Color is never on when writing a file, so one render serves either destination
+    report_lines = iter_report(
         results, 
         end_time - start_time, 
         use_color, 
         engine.was_interrupted,
         show_stats=args.stats
-)
+    )
 
     if is_writing_file:
         filename = auto_out_name(target_path) if args.out is True else args.out
         try:
-            clean_lines = generate_report(
-                results, 
-                end_time - start_time, 
-                False, 
-                engine.was_interrupted,
-                show_stats=args.stats
-            )
             with open(filename, "w", encoding="utf-8") as f:
-                f.write("\n".join(clean_lines) + "\n")
+                f.writelines(line + "\n" for line in report_lines)
             print(f"Output written to: {filename}")
         except Exception as e:
             print(f"Error writing to file: {e}")
     else:
-        print("\n".join(report_lines))
+        write_report(report_lines)
 
 
 if __name__ == "__main__":
@@ -76,7 +76,7 @@ LANGUAGES = {
         "name": "HTML",
         "color": Colors.RED,
         "single": None,
-        "multi": (""),
+        "multi": ("<!--", "-->"),
     },
     ".css": {
         "name": "CSS",
@@ -155,7 +155,7 @@ LANGUAGES = {
         "name": "Markdown",
         "color": Colors.WHITE,
         "single": None,
-        "multi": (""),
+        "multi": ("<!--", "-->"),
     },
     ".yaml": {"name": "YAML", "color": Colors.CYAN, "single": "#", "multi": None},
     ".yml": {"name": "YAML", "color": Colors.CYAN, "single": "#", "multi": None},
@@ -164,7 +164,7 @@ LANGUAGES = {
         "name": "XML",
         "color": Colors.RED,
         "single": None,
-        "multi": (""),
+        "multi": ("<!--", "-->"),
     },
     ".sql": {
         "name": "SQL",
@@ -1,6 +1,7 @@
 import unittest
 import os
 import shutil
+import subprocess
 import tempfile
 import sys
 
@@ -27,6 +28,13 @@ class TestLocr(unittest.TestCase):
             f.write(content)
         return full_path
 
+    def git(self, *args, cwd=None, check=True):
+        """Helper to run git quietly in the temp dir (or cwd), with a throwaway identity."""
+        return subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", "-c", "protocol.file.allow=always", *args],
+            cwd=cwd or self.test_dir, check=check, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
     def test_python_counts(self):
         """Test basic counting logic for Python."""
         content = (
@@ -58,6 +66,24 @@ class TestLocr(unittest.TestCase):
         # Should only find the valid.js, ignoring node_modules completely
         self.assertEqual(results["JavaScript"]["files"], 1)
 
+    def test_default_ignores_can_be_reincluded(self):
+        """Ensure a '!' rule in a .gitignore overrides the built-in prune list."""
+        self.create_file(".gitignore", "!bin/\n")
+        self.create_file("bin/tool.sh", "echo hi")
+        self.create_file("dist/app.js", "x = 1;")
+
+        engine = LocrEngine(self.test_dir)
+        files = [p for p, _ in engine._collect_and_filter_files()]
+
+        self.assertEqual(files, ["bin/tool.sh"])
+
+        # Same result when Git lists the files
+        if shutil.which("git"):
+            subprocess.run(["git", "init", "-q"], cwd=self.test_dir, check=True)
+            engine = LocrEngine(self.test_dir)
+            files = [p for p, _ in engine._collect_and_filter_files()]
+            self.assertEqual(files, ["bin/tool.sh"])
+
     def test_gitignore_respect(self):
         """Ensure .gitignore rules are respected."""
         # 1. Create a .gitignore
@@ -78,6 +104,278 @@ class TestLocr(unittest.TestCase):
         # Should not find any log files (assuming .log isn't in LANGUAGES anyway, 
         # but secret.py IS in LANGUAGES, so checking that confirms gitignore works)
 
+    def test_gitignore_negation_and_nesting(self):
+        """Ensure negations, anchors and nested .gitignore files follow Git's rules."""
+        self.create_file(".gitignore", "*.py\n!keep.py\n/build/\n")
+        self.create_file("sub/.gitignore", "!*.py\nlocal.py\n")
+        self.create_file("drop.py", "x = 1")
+        self.create_file("keep.py", "x = 1")
+        self.create_file("build/out.js", "x = 1;")
+        self.create_file("src/build/out.js", "x = 1;")
+        self.create_file("sub/app.py", "x = 1")
+        self.create_file("sub/local.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        files = sorted(p for p, _ in engine._collect_and_filter_files())
+
+        # /build/ is anchored, but "build" is also a default prune name
+        self.assertEqual(files, ["keep.py", "sub/app.py"])
+
+    def test_repeated_names_across_directories(self):
+        """Ensure a name's verdict is reused only under the same ignore files."""
+        self.create_file(".gitignore", "gen.py\ncache/\n")
+        self.create_file("sub/.gitignore", "!gen.py\n")
+        for d in ("", "a/", "a/b/", "sub/", "sub/c/"):
+            self.create_file(f"{d}gen.py", "x = 1")
+            self.create_file(f"{d}cache/m.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        files = sorted(p for p, _ in engine._collect_and_filter_files())
+
+        self.assertEqual(files, ["sub/c/gen.py", "sub/gen.py"])
+
+    def test_gitignore_with_bom(self):
+        """Ensure a UTF-8 byte order mark does not hide the first pattern."""
+        self.create_file(".gitignore", "\ufeffsecret.py\n")
+        self.create_file("secret.py", "x = 1")
+        self.create_file("app.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        files = [p for p, _ in engine._collect_and_filter_files()]
+
+        self.assertEqual(files, ["app.py"])
+
+    def test_literal_and_extension_rules(self):
+        """Ensure plain names, paths and '*.ext' rules keep Git's dir-only and precedence rules."""
+        self.create_file(".gitignore", "*.js/\ndocs/a.py\n*.py\n!b.py\nlib/\n")
+        self.create_file("app.js", "x = 1;")
+        self.create_file("docs/a.py", "x = 1")
+        self.create_file("src/docs/a.py", "x = 1")
+        self.create_file("src/b.py", "x = 1")
+        self.create_file("lib", "not a directory")
+
+        engine = LocrEngine(self.test_dir)
+        files = sorted(p for p, _ in engine._collect_and_filter_files())
+
+        self.assertEqual(files, ["app.js", "src/b.py"])
+
+    def test_repeated_glob_rules(self):
+        """Ensure a glob repeated later in the file still outranks a negation between its copies."""
+        self.create_file(".gitignore", "gen_*.py\n!gen_keep.py\ngen_*.py\n!gen_?eep2.py\n")
+        self.create_file("gen_keep.py", "x = 1")
+        self.create_file("gen_keep2.py", "x = 1")
+        self.create_file("main.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        files = sorted(p for p, _ in engine._collect_and_filter_files())
+
+        self.assertEqual(files, ["gen_keep2.py", "main.py"])
+
+    def test_git_info_exclude(self):
+        """Ensure .git/info/exclude is honoured without asking Git."""
+        self.create_file(".git/info/exclude", "private/\n")
+        self.create_file("private/secret.py", "x = 1")
+        self.create_file("app.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        results = engine.scan()
+
+        self.assertEqual(results["Python"]["files"], 1)
+
+    def test_gitignore_cache_invalidation(self):
+        """Ensure cached .gitignore rules are reused, but refreshed when the file changes."""
+        self.create_file("pkg/.gitignore", "a.py\n")
+        self.create_file("pkg/a.py", "x = 1")
+        self.create_file("pkg/b.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        collect = lambda: [p for p, _ in engine._collect_and_filter_files()]
+        self.assertEqual(collect(), ["pkg/b.py"])
+        cached = dict(engine._rules_cache)
+        self.assertEqual(collect(), ["pkg/b.py"])
+        self.assertEqual(engine._rules_cache, cached)
+
+        self.create_file("pkg/.gitignore", "b.py\nc.py\n")
+        self.assertEqual(collect(), ["pkg/a.py"])
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_git_repo_listing(self):
+        """Ensure Git repos are listed by Git, with the default prune list still applied."""
+        self.create_file(".gitignore", "generated/\n")
+        self.create_file("tracked.py", "x = 1")
+        self.create_file("untracked.py", "x = 1")
+        self.create_file("generated/out.py", "x = 1")
+        self.create_file("node_modules/lib.js", "x = 1;")
+        subprocess.run(["git", "init", "-q"], cwd=self.test_dir, check=True)
+        subprocess.run(["git", "add", "tracked.py", "node_modules"], cwd=self.test_dir, check=True)
+
+        engine = LocrEngine(self.test_dir)
+        files = sorted(p for p, _ in engine._collect_and_filter_files())
+
+        self.assertEqual(files, ["tracked.py", "untracked.py"])
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_git_tracked_file_matching_exclude(self):
+        """Ensure info/exclude, like Git, only hides untracked files from the listing."""
+        self.create_file("secret.py", "x = 1")
+        self.create_file("other.py", "x = 1")
+        subprocess.run(["git", "init", "-q"], cwd=self.test_dir, check=True)
+        subprocess.run(["git", "add", "secret.py"], cwd=self.test_dir, check=True)
+        self.create_file(".git/info/exclude", "secret.py\nother.py\n")
+
+        engine = LocrEngine(self.test_dir)
+        files = [p for p, _ in engine._collect_and_filter_files()]
+
+        self.assertEqual(files, ["secret.py"])
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_git_submodules_counted(self):
+        """Ensure files inside a submodule are counted, as they are by the walk."""
+        upstream = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upstream)
+        with open(os.path.join(upstream, "lib.py"), "w") as f:
+            f.write("x = 1")
+        self.git("init", "-q", cwd=upstream)
+        self.git("add", "lib.py", cwd=upstream)
+        self.git("commit", "-qm", "lib", cwd=upstream)
+        self.create_file("app.py", "x = 1")
+        self.git("init", "-q")
+        self.git("submodule", "add", "-q", upstream, "vendored")
+
+        for git_verify in (True, False):
+            engine = LocrEngine(self.test_dir, git_verify=git_verify)
+            files = sorted(p for p, _ in engine._collect_and_filter_files())
+            self.assertEqual(files, ["app.py", "vendored/lib.py"])
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_git_conflicted_file_counted_once(self):
+        """Ensure a path Git lists once per conflict stage is only counted once."""
+        self.git("init", "-q")
+        self.create_file("a.py", "x = 0")
+        self.git("add", "a.py")
+        self.git("commit", "-qm", "base")
+        self.git("checkout", "-qb", "other")
+        self.create_file("a.py", "x = 1")
+        self.git("commit", "-qam", "other")
+        self.git("checkout", "-q", "-")
+        self.create_file("a.py", "x = 2")
+        self.git("commit", "-qam", "main")
+        # Expected to fail: both branches changed the same line
+        self.git("merge", "-q", "other", check=False)
+        self.assertTrue(self.git("ls-files", "-u").stdout, "merge did not leave a conflict")
+
+        results = LocrEngine(self.test_dir).scan()
+
+        self.assertEqual(results["Python"]["files"], 1)
+
+    def test_untranslatable_patterns_skipped(self):
+        """Ensure a pattern that can't be mirrored exactly is skipped, and the rest still apply."""
+        self.create_file(".gitignore", "gen[[:digit:]].py\ndrop.py\n")
+        self.create_file("gen1.py", "x = 1")
+        self.create_file("drop.py", "x = 1")
+        self.create_file("app.py", "x = 1")
+
+        engine = LocrEngine(self.test_dir)
+        files = sorted(p for p, _ in engine._collect_and_filter_files())
+
+        self.assertEqual(files, ["app.py", "gen1.py"])
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_no_git_verify(self):
+        """Ensure Git is never run without verification."""
+        self.create_file(".gitignore", "gen[[:digit:]].py\n")
+        self.create_file("gen1.py", "x = 1")
+        subprocess.run(["git", "init", "-q"], cwd=self.test_dir, check=True)
+
+        engine = LocrEngine(self.test_dir, git_verify=False)
+        engine._git_ls_files = engine._submodule_paths = None
+        self.assertEqual(engine.scan()["Python"]["files"], 1)
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "FIFOs are POSIX-only")
+    def test_special_files_skipped(self):
+        """Ensure a FIFO with a source extension is skipped instead of blocking the scan."""
+        self.create_file("app.py", "x = 1")
+        os.mkfifo(os.path.join(self.test_dir, "pipe.py"))
+
+        engine = LocrEngine(self.test_dir)
+        results = engine.scan()
+
+        self.assertEqual(results["Python"]["files"], 1)
+
+        # Git lists a symlink to one too, so opening it must not block either
+        if shutil.which("git"):
+            os.symlink("pipe.py", os.path.join(self.test_dir, "link.py"))
+            self.git("init", "-q")
+            self.assertIn("link.py", self.git("ls-files", "-o").stdout.decode())
+            self.assertEqual(LocrEngine(self.test_dir).scan()["Python"]["files"], 1)
+
+    def test_max_size(self):
+        """Ensure files above the size limit are skipped."""
+        self.create_file("small.sql", "SELECT 1;\n")
+        self.create_file("dump.sql", "INSERT INTO t VALUES (1);\n" * 100)
+
+        engine = LocrEngine(self.test_dir, max_size=1024)
+        results = engine.scan()
+
+        self.assertEqual(results["SQL"]["files"], 1)
+        self.assertEqual(results["SQL"]["code"], 1)
+
+    @unittest.skipUnless(os.name == "posix", "descriptor limits are POSIX-only")
+    def test_descriptor_limit(self):
+        """Ensure running out of file descriptors never drops files from the counts."""
+        import resource
+        for i in range(40):
+            self.create_file(f"m{i}.py", "x = 1")
+        # Descriptors are handed out lowest first, so this leaves room for only a few
+        probe = os.open(os.devnull, os.O_RDONLY)
+        os.close(probe)
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (probe + 4, hard))
+        self.addCleanup(resource.setrlimit, resource.RLIMIT_NOFILE, (soft, hard))
+
+        results = LocrEngine(self.test_dir, jobs=1, io_threads=1).scan()
+
+        self.assertEqual(results["Python"]["files"], 40)
+
+    def test_large_file_mapped(self):
+        """Ensure files past the mmap threshold count the same as small ones."""
+        chunk = '"""\nDoc\n"""\r\nx = 1\n\n# note\n'
+        self.create_file("big.py", chunk * 40000)
+
+        engine = LocrEngine(self.test_dir, max_size=None)
+        py = engine.scan()["Python"]
+
+        self.assertEqual((py["blank"], py["comment"], py["code"]), (40000, 160000, 40000))
+
+    def test_process_pool_matches_threads(self):
+        """Ensure sharding the analysis across processes gives the same totals."""
+        for i in range(40):
+            self.create_file(f"pkg{i % 3}/m{i}.py", "# c\n\n" + "x = 1\n" * i)
+            self.create_file(f"web/s{i}.js", "// c\ny();\n")
+
+        threaded = LocrEngine(self.test_dir).scan()
+        pooled = LocrEngine(self.test_dir, jobs=2).scan()
+        # Tiny files: the automatic choice stays in-process
+        auto = LocrEngine(self.test_dir, jobs=None, io_threads=1).scan()
+
+        self.assertEqual(pooled, threaded)
+        self.assertEqual(auto, threaded)
+        self.assertEqual(pooled["Python"]["files"], 40)
+
+    def test_locality_order(self):
+        """Ensure --locality only reorders files by inode, never changes what is counted."""
+        for i in range(10):
+            self.create_file(f"d{i % 3}/m{i}.py", "x = 1\n")
+
+        plain = LocrEngine(self.test_dir)
+        ordered = LocrEngine(self.test_dir, locality=True)
+        files = [p for p, _ in ordered._collect_and_filter_files()]
+        inodes = [os.stat(os.path.join(self.test_dir, p)).st_ino for p in files]
+
+        self.assertEqual(inodes, sorted(inodes))
+        self.assertEqual(sorted(files), sorted(p for p, _ in plain._collect_and_filter_files()))
+        self.assertEqual(ordered.scan(), plain.scan())
+
     def test_heuristic_edge_cases(self):
         """ 
         Testing the limitations of the heuristic scanner.
@@ -119,5 +417,34 @@ class TestLocr(unittest.TestCase):
         self.assertEqual(results["Python"]["comment"], 3)
         self.assertEqual(results["Python"]["code"], 1)
 
+    def test_line_endings_around_blocks(self):
+        """Ensure CRLF and old Mac (lone CR) endings classify blocks like LF does."""
+        content = '# note\n  """doc\n\n"""\nx = 1\n  \n'
+        for i, ending in enumerate(("\n", "\r\n", "\r")):
+            with open(os.path.join(self.test_dir, f"e{i}.py"), "wb") as f:
+                f.write(content.replace("\n", ending).encode())
+
+        engine = LocrEngine(self.test_dir)
+        py = engine.scan()["Python"]
+
+        self.assertEqual((py["blank"], py["comment"], py["code"]), (6, 9, 3))
+
+    def test_markup_comments(self):
+        """Test HTML-style comments in markup languages."""
+        content = (
+            '<!-- header -->\n'    # Comment
+            '<p>Hi</p>\n'          # Code
+            '\n'                   # Blank
+            '<!--\n'               # Comment (Block start)
+            '<p>old</p>\n'         # Comment
+            '-->\n'                # Comment (Block end)
+        )
+        self.create_file("index.html", content)
+
+        engine = LocrEngine(self.test_dir)
+        html = engine.scan()["HTML"]
+
+        self.assertEqual((html["blank"], html["comment"], html["code"]), (1, 4, 1))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file